@@ -1,8 +1,50 @@
 # JupyterHub Configuration for Cluster-OS
 # Advanced configuration with dual spawner support
 
+import functools
 import os
+import sqlite3
+import sys
 from jupyterhub.spawner import SimpleLocalProcessSpawner
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Profile selection form; a single interned module-level string, so every
+# spawner shares one reference.
+PROFILE_FORM_TEMPLATE = sys.intern('''
+<style>
+    .profile-option {
+        border: 1px solid #ddd;
+        border-radius: 4px;
+        padding: 15px;
+        margin: 10px 0;
+        cursor: pointer;
+    }
+    .profile-option:hover {
+        background-color: #f5f5f5;
+    }
+</style>
+
+<div>
+    <h3>Select Notebook Environment:</h3>
+
+    <div class="profile-option">
+        <input type="radio" name="profile" value="0" checked>
+        <label for="profile-0">
+            <strong>Kubernetes (Default)</strong><br>
+            <small>Run notebook in Kubernetes pod. Best for most users.</small>
+        </label>
+    </div>
+
+    <div class="profile-option">
+        <input type="radio" name="profile" value="1">
+        <label for="profile-1">
+            <strong>SLURM Batch</strong><br>
+            <small>Run notebook as SLURM job. For HPC workloads.</small>
+        </label>
+    </div>
+</div>
+''')
 
 # =============================================================================
 # Basic JupyterHub Configuration
@@ -15,6 +57,14 @@ c.JupyterHub.bind_url = 'http://0.0.0.0:8000'
 
 # Database
 c.JupyterHub.db_url = 'sqlite:///srv/jupyterhub/jupyterhub.sqlite'
+# Wait on write locks instead of failing under concurrent spawns; WAL
+# pragmas are applied per-connection in the Database Tuning section
+c.JupyterHub.db_kwargs = {
+    'connect_args': {'check_same_thread': False, 'timeout': 30},
+}
+# For larger deployments use PostgreSQL instead of SQLite:
+# c.JupyterHub.db_url = 'postgresql+psycopg2://jhub@db/jhub'
+# c.JupyterHub.db_kwargs = {'pool_size': 20, 'max_overflow': 40}
 
 # Cookie secret
 c.JupyterHub.cookie_secret_file = '/srv/jupyterhub/cookie_secret'
@@ -46,8 +96,12 @@ c.JupyterHub.spawner_class = 'kubespawner.KubeSpawner'
 # Kubernetes namespace
 c.KubeSpawner.namespace = 'jupyterhub'
 
-# Container image
-c.KubeSpawner.image = 'jupyter/scipy-notebook:latest'
+# Container image - pre-pulled onto every node by image-prepuller.yaml,
+# so spawns use the local copy instead of re-checking the registry.
+# Dated tags are never re-pushed; bump the tag here, in image-prepuller.yaml
+# and in the deployment.yaml ConfigMap to roll out an update.
+c.KubeSpawner.image = 'jupyter/scipy-notebook:2023-10-20'
+c.KubeSpawner.image_pull_policy = 'IfNotPresent'
 
 # Timeouts
 c.KubeSpawner.start_timeout = 300
@@ -101,75 +155,8 @@ c.KubeSpawner.environment = {
 # Profile Configuration (Allow users to choose spawner)
 # =============================================================================
 
-# Enable profile selection
-c.Spawner.profile_form_template = '''
-<style>
-    .profile-option {
-        border: 1px solid #ddd;
-        border-radius: 4px;
-        padding: 15px;
-        margin: 10px 0;
-        cursor: pointer;
-    }
-    .profile-option:hover {
-        background-color: #f5f5f5;
-    }
-</style>
-
-<div>
-    <h3>Select Notebook Environment:</h3>
-
-    <div class="profile-option">
-        <input type="radio" name="profile" value="0" checked>
-        <label for="profile-0">
-            <strong>Kubernetes (Default)</strong><br>
-            <small>Run notebook in Kubernetes pod. Best for most users.</small>
-        </label>
-    </div>
-
-    <div class="profile-option">
-        <input type="radio" name="profile" value="1">
-        <label for="profile-1">
-            <strong>SLURM Batch</strong><br>
-            <small>Run notebook as SLURM job. For HPC workloads.</small>
-        </label>
-    </div>
-</div>
-'''
-
-# Define profiles
-c.Spawner.profile_list = [
-    {
-        'display_name': 'Kubernetes - Small',
-        'description': 'Small notebook (2 CPU, 4GB RAM)',
-        'kubespawner_override': {
-            'cpu_limit': 2,
-            'cpu_guarantee': 0.5,
-            'mem_limit': '4G',
-            'mem_guarantee': '1G',
-        }
-    },
-    {
-        'display_name': 'Kubernetes - Medium',
-        'description': 'Medium notebook (4 CPU, 8GB RAM)',
-        'kubespawner_override': {
-            'cpu_limit': 4,
-            'cpu_guarantee': 1,
-            'mem_limit': '8G',
-            'mem_guarantee': '2G',
-        }
-    },
-    {
-        'display_name': 'Kubernetes - Large',
-        'description': 'Large notebook (8 CPU, 16GB RAM)',
-        'kubespawner_override': {
-            'cpu_limit': 8,
-            'cpu_guarantee': 2,
-            'mem_limit': '16G',
-            'mem_guarantee': '4G',
-        }
-    },
-]
+# Enable profile selection (profile_list itself is built lazily below)
+c.Spawner.profile_form_template = PROFILE_FORM_TEMPLATE
 
 # =============================================================================
 # Server Configuration
@@ -180,10 +167,24 @@ c.JupyterHub.allow_named_servers = True
 c.JupyterHub.named_server_limit_per_user = 3
 
 # Idle culler - shut down inactive notebooks
+# JupyterHub has no in-process hook for this, so it stays a managed
+# service, but with only the scopes it needs instead of full admin
+c.JupyterHub.load_roles = [
+    {
+        'name': 'idle-culler',
+        'scopes': [
+            'list:users',
+            'read:users:activity',
+            'read:servers',
+            'delete:servers',
+        ],
+        'services': ['idle-culler'],
+    }
+]
+
 c.JupyterHub.services = [
     {
         'name': 'idle-culler',
-        'admin': True,
         'command': [
             'python3',
             '-m',
@@ -207,16 +208,31 @@ c.KubeSpawner.volume_mounts = [
     }
 ]
 
+# ReadOnlyMany claim on the shared NFS volume (see deployment.yaml), mounted
+# with FS-Cache so repeat imports on a node are served from local disk
 c.KubeSpawner.volumes = [
     {
         'name': 'shared-conda',
-        'nfs': {
-            'server': 'nfs.cluster-os.local',
-            'path': '/shared/conda',
+        'persistentVolumeClaim': {
+            'claimName': 'shared-conda-rox',
+            'readOnly': True,
         }
     }
 ]
 
+# Prefer nodes already running notebooks, whose conda cache is warm
+c.KubeSpawner.pod_affinity_preferred = [
+    {
+        'weight': 50,
+        'podAffinityTerm': {
+            'labelSelector': {
+                'matchLabels': {'component': 'singleuser-server'},
+            },
+            'topologyKey': 'kubernetes.io/hostname',
+        },
+    }
+]
+
 # =============================================================================
 # Logging Configuration
 # =============================================================================
@@ -236,6 +252,71 @@ c.Application.log_format = '%(color)s[%(levelname)1.1s %(asctime)s.%(msecs).03d
 c.JupyterHub.cleanup_servers = True
 c.JupyterHub.cleanup_proxy = True
 
+# =============================================================================
+# Database Tuning
+# =============================================================================
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling so readers don't block on the hub's writes"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA mmap_size=268435456')  # 256MB
+    cursor.close()
+
+
+# =============================================================================
+# Spawner Profiles (built on first spawn, not at hub start)
+# =============================================================================
+
+# KubeSpawner invokes profile_list(spawner) when rendering the options form.
+
+@functools.lru_cache(maxsize=1)
+def _build_profiles():
+    """Build the spawner profile definitions once"""
+    return (
+        {
+            'display_name': 'Kubernetes - Small',
+            'description': 'Small notebook (2 CPU, 4GB RAM)',
+            'kubespawner_override': {
+                'cpu_limit': 2,
+                'cpu_guarantee': 0.5,
+                'mem_limit': '4G',
+                'mem_guarantee': '1G',
+            }
+        },
+        {
+            'display_name': 'Kubernetes - Medium',
+            'description': 'Medium notebook (4 CPU, 8GB RAM)',
+            'kubespawner_override': {
+                'cpu_limit': 4,
+                'cpu_guarantee': 1,
+                'mem_limit': '8G',
+                'mem_guarantee': '2G',
+            }
+        },
+        {
+            'display_name': 'Kubernetes - Large',
+            'description': 'Large notebook (8 CPU, 16GB RAM)',
+            'kubespawner_override': {
+                'cpu_limit': 8,
+                'cpu_guarantee': 2,
+                'mem_limit': '16G',
+                'mem_guarantee': '4G',
+            }
+        },
+    )
+
+
+def _profile_list(spawner):
+    return list(_build_profiles())
+
+
+c.KubeSpawner.profile_list = _profile_list
+
 # =============================================================================
 # Custom Configuration
 # =============================================================================
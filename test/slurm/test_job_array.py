@@ -10,26 +10,113 @@ import socket
 import time
 import random
 from datetime import datetime
+from functools import lru_cache
 
+# Number of random pairs drawn per NumPy batch (caps memory at ~16MB per batch)
+WORK_CHUNK = 1 << 20
 
-def simulate_workload(task_id, duration_seconds):
-    """Simulate some computational work"""
+# Random pairs per batch in wallclock mode, between checks of the clock
+WALLCLOCK_CHUNK = 1 << 14
+
+# (base, jitter) work duration in seconds, indexed by task_id - 1
+# Tasks 1-3: short work (5-7s), 4-7: medium (15-20s), 8+: long (30-40s)
+DURATION_BUCKETS = (
+    (5, 2), (5, 2), (5, 2),
+    (15, 5), (15, 5), (15, 5), (15, 5),
+    (30, 10), (30, 10), (30, 10),
+)
+
+
+def _work(n, seed):
+    """Multiply-accumulate n random pairs from a local seeded generator"""
+    rnd = random.Random(seed).random
+    result = 0.0
+    for _ in range(n):
+        result += rnd() * rnd()
+    return result
+
+
+def _work_numba(n, seed):
+    """Numba kernel for _work; only ever run compiled, see _get_work()
+
+    Numba only supports the module-level random functions; inside compiled
+    code they use Numba's own generator, not the interpreter's global state.
+    """
+    random.seed(seed)
+    result = 0.0
+    for _ in range(n):
+        result += random.random() * random.random()
+    return result
+
+
+# NumPy and Numba are imported only when their mode is selected, so tasks in
+# the default wallclock mode don't pay for loading them
+
+@lru_cache(maxsize=None)
+def _get_numpy():
+    """Return the numpy module, or None if it is not installed"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=None)
+def _get_work():
+    """Return _work compiled with Numba, or the pure-Python _work without it"""
+    try:
+        from numba import njit
+    except ImportError:
+        return _work
+    return njit(cache=True, fastmath=True)(_work_numba)
+
+
+def simulate_workload(task_id, duration_seconds, mode='wallclock'):
+    """Simulate some computational work
+
+    mode='wallclock' keeps multiplying random pairs until duration_seconds
+    of wall time have passed, so tasks really take their planned time.
+    The other modes do a fixed duration_seconds * 1e6 pairs and finish in
+    well under that: mode='numpy' in vectorized batches (falls back to
+    'python' without NumPy), mode='numba' JIT-compiled and seeded by
+    task_id, mode='python' in an interpreter loop.
+    """
     hostname = socket.gethostname()
+    np = _get_numpy() if mode == 'numpy' else None
+    work = _get_work() if mode == 'numba' else None
     start_time = time.time()
 
     print(f"Task {task_id}: Starting on {hostname} at {datetime.now()}")
 
     # Simulate work with random CPU usage
     work_iterations = duration_seconds * 1000000
-    result = 0
-
-    for i in range(work_iterations):
-        result += random.random() * random.random()
+    result = 0.0
+
+    if mode == 'wallclock':
+        rnd = random.Random().random
+        while time.time() - start_time < duration_seconds:
+            for _ in range(WALLCLOCK_CHUNK):
+                result += rnd() * rnd()
+    elif mode == 'numpy' and np is not None:
+        remaining = work_iterations
+        while remaining > 0:
+            n = min(WORK_CHUNK, remaining)
+            a = np.random.random(n)
+            b = np.random.random(n)
+            result += float(np.dot(a, b))
+            remaining -= n
+    elif mode == 'numba':
+        result = work(work_iterations, task_id)
+    else:
+        rnd = random.Random().random
+        for _ in range(work_iterations):
+            result += rnd() * rnd()
 
     end_time = time.time()
     actual_duration = end_time - start_time
 
-    print(".2f"
+    print(f"Task {task_id}: Completed in {actual_duration:.2f} seconds")
     return result, actual_duration
 
 
@@ -59,27 +146,31 @@ def main():
     print(f"Allocated nodes: {node_list}")
 
     # Simulate different amounts of work for each task
-    # Tasks 1-3: short work, 4-7: medium work, 8-10: long work
-    if task_id <= 3:
-        duration = 5 + random.uniform(0, 2)  # 5-7 seconds
-    elif task_id <= 7:
-        duration = 15 + random.uniform(0, 5)  # 15-20 seconds
-    else:
-        duration = 30 + random.uniform(0, 10)  # 30-40 seconds
+    base, jitter = DURATION_BUCKETS[min(max(task_id, 1), len(DURATION_BUCKETS)) - 1]
+    duration = base + random.uniform(0, jitter)
 
     print(f"Planned work duration: {duration:.1f} seconds")
 
-    # Do the work
-    result, actual_duration = simulate_workload(task_id, int(duration))
+    # Do the work (WORKLOAD_MODE=wallclock|numpy|numba|python; only
+    # wallclock runs for the planned duration, the others finish early)
+    mode = os.environ.get('WORKLOAD_MODE', 'wallclock')
+    result, actual_duration = simulate_workload(task_id, int(duration), mode)
 
     # Verify we can write to shared filesystem
     output_file = f"/tmp/job_array_task_{task_id}.out"
+    payload = (
+        f"Task {task_id} completed successfully\n"
+        f"Result: {result:.6f}\n"
+        f"Duration: {actual_duration:.2f} seconds\n"
+        f"Completed at: {datetime.now()}\n"
+    ).encode()
     try:
-        with open(output_file, 'w') as f:
-            f.write(f"Task {task_id} completed successfully\n")
-            f.write(f"Result: {result:.6f}\n")
-            f.write(f"Duration: {actual_duration:.2f} seconds\n")
-            f.write(f"Completed at: {datetime.now()}\n")
+        # Single write(2) so concurrent array tasks each land one small write
+        fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
         print(f"✅ Output written to: {output_file}")
     except Exception as e:
         print(f"❌ Failed to write output file: {e}")
@@ -9,13 +9,27 @@ import os
 import socket
 import time
 import subprocess
+import tempfile
 from datetime import datetime
 
+try:
+    import pyslurm
+    HAVE_PYSLURM = True
+except ImportError:
+    HAVE_PYSLURM = False
+
+# Seconds between status polls; the last interval repeats once reached
+POLL_INTERVALS = (1, 2, 5, 10)
+
 
 def run_command(cmd, description=""):
-    """Run a command and return (success, output, error)"""
+    """Run a command and return (success, output, error)
+
+    cmd may be a string (run through the shell) or an argv list (exec'd
+    directly, without an intermediate /bin/sh).
+    """
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
+        result = subprocess.run(cmd, shell=isinstance(cmd, str), capture_output=True, text=True, timeout=60)
         return result.returncode == 0, result.stdout.strip(), result.stderr.strip()
     except subprocess.TimeoutExpired:
         return False, "", "Command timed out"
@@ -23,6 +37,58 @@ def run_command(cmd, description=""):
         return False, "", str(e)
 
 
+def query_controller_states(job_ids):
+    """Return {job_id: state} for the given jobs still known to slurmctld
+
+    Uses the pyslurm bindings when available (one RPC, no fork/exec) and a
+    single squeue otherwise. Jobs missing from the result have aged out of
+    the controller and must be looked up in accounting.
+    """
+    if HAVE_PYSLURM:
+        try:
+            return {str(job.id): job.state for job in pyslurm.Jobs.load().values()
+                    if str(job.id) in job_ids}
+        except Exception:
+            pass  # Fall back to squeue
+
+    success, output, error = run_command(
+        ["squeue", "-h", "-t", "all", "-j", ','.join(job_ids), "-o", "%i %T"])
+    states = {}
+    for line in output.splitlines():
+        job_id, _, state = line.partition(' ')
+        states[job_id] = state
+    return states
+
+
+def query_accounting_states(job_ids):
+    """Return {job_id: state} for the given jobs from slurmdbd via sacct"""
+    success, output, error = run_command(
+        ["sacct", "-j", ','.join(job_ids), "--format=JobID,State", "--noheader", "--parsable2"])
+    states = {}
+    if success:
+        for line in output.splitlines():
+            job_id, _, state = line.partition('|')
+            states.setdefault(job_id, state)  # first line is the job itself, not a step
+    return states
+
+
+def submit_script(script):
+    """Write a batch script to a unique temp file and sbatch it
+
+    Returns (success, output, error) from sbatch. The script file is removed
+    afterwards since sbatch copies it at submission time.
+    """
+    fd, path = tempfile.mkstemp(prefix='dep_test_', suffix='.sh')
+    try:
+        os.write(fd, script.encode())
+    finally:
+        os.close(fd)
+    try:
+        return run_command(["sbatch", path])
+    finally:
+        os.unlink(path)
+
+
 def submit_dependent_jobs():
     """Submit a chain of dependent jobs"""
     hostname = socket.gethostname()
@@ -85,11 +151,7 @@ fi
 """
 
     # Submit Job 1
-    with open('/tmp/job1.sh', 'w') as f:
-        f.write(job1_script)
-    os.chmod('/tmp/job1.sh', 0o755)
-
-    success, output, error = run_command("sbatch /tmp/job1.sh")
+    success, output, error = submit_script(job1_script)
     if not success:
         print(f"❌ Failed to submit Job 1: {error}")
         return None, None, None
@@ -99,11 +161,7 @@ fi
 
     # Submit Job 2 with dependency on Job 1
     job2_script = job2_script.replace('$JOB1_ID', job1_id)
-    with open('/tmp/job2.sh', 'w') as f:
-        f.write(job2_script)
-    os.chmod('/tmp/job2.sh', 0o755)
-
-    success, output, error = run_command("sbatch /tmp/job2.sh")
+    success, output, error = submit_script(job2_script)
     if not success:
         print(f"❌ Failed to submit Job 2: {error}")
         return job1_id, None, None
@@ -113,11 +171,7 @@ fi
 
     # Submit Job 3 with dependency on Job 2
     job3_script = job3_script.replace('$JOB2_ID', job2_id)
-    with open('/tmp/job3.sh', 'w') as f:
-        f.write(job3_script)
-    os.chmod('/tmp/job3.sh', 0o755)
-
-    success, output, error = run_command("sbatch /tmp/job3.sh")
+    success, output, error = submit_script(job3_script)
     if not success:
         print(f"❌ Failed to submit Job 3: {error}")
         return job1_id, job2_id, None
@@ -134,35 +188,35 @@ def wait_for_jobs(job_ids):
 
     max_wait_time = 300  # 5 minutes
     start_time = time.time()
+    poll = 0
 
     while time.time() - start_time < max_wait_time:
         all_completed = True
         completed_jobs = []
         failed_jobs = []
 
+        # Controller state is current; only jobs that have already aged out
+        # of the controller are looked up in accounting
+        states = query_controller_states(job_ids)
+        missing = [job_id for job_id in job_ids if job_id not in states]
+        if missing:
+            states.update(query_accounting_states(missing))
+
         for job_id in job_ids:
-            success, output, error = run_command(f"squeue -h -j {job_id}")
-            if output.strip():  # Job still in queue
-                all_completed = False
+            state = states.get(job_id, '')
+            if 'COMPLETED' in state:
+                completed_jobs.append(job_id)
+            elif 'FAILED' in state or 'CANCELLED' in state:
+                failed_jobs.append(job_id)
             else:
-                # Check job status
-                success, output, error = run_command(f"sacct -j {job_id} --format=State --noheader --parsable2")
-                if success and output.strip():
-                    state = output.strip().split('\n')[0]
-                    if 'COMPLETED' in state:
-                        completed_jobs.append(job_id)
-                    elif 'FAILED' in state or 'CANCELLED' in state:
-                        failed_jobs.append(job_id)
-                    else:
-                        all_completed = False  # Still running or other state
-                else:
-                    all_completed = False
+                all_completed = False  # Pending, running, other state, or not yet in accounting
 
         if all_completed:
             break
 
         print(f"Waiting... ({int(time.time() - start_time)}s elapsed)")
-        time.sleep(5)
+        time.sleep(POLL_INTERVALS[min(poll, len(POLL_INTERVALS) - 1)])
+        poll += 1
 
     return completed_jobs, failed_jobs
 
@@ -227,8 +281,7 @@ def main():
     job_ids = [job1_id, job2_id, job3_id]
     completed, failed = wait_for_jobs(job_ids)
 
-    print("
-Job completion status:")
+    print("\nJob completion status:")
     print(f"Completed: {', '.join(completed)}")
     print(f"Failed: {', '.join(failed)}")
 
@@ -16,6 +16,19 @@ except ImportError:
 import socket
 import os
 
+try:
+    import orjson
+
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    import json
+
+    def dumps(obj):
+        return json.dumps(obj).encode()
+
+    loads = json.loads
+
 
 def main():
     # Initialize MPI
@@ -45,12 +58,16 @@ def main():
         if size > 1:
             print("\nTesting MPI send/receive...")
             data_to_send = {"message": "Hello from rank 0", "value": 42}
-            comm.send(data_to_send, dest=1, tag=11)
+            comm.Send([dumps(data_to_send), MPI.BYTE], dest=1, tag=11)
             print(f"Rank 0: Sent data to rank 1: {data_to_send}")
 
     elif rank == 1:
-        # Receive data from rank 0
-        data_received = comm.recv(source=0, tag=11)
+        # Receive data from rank 0 (probe first to size the byte buffer)
+        status = MPI.Status()
+        comm.Probe(source=0, tag=11, status=status)
+        payload = bytearray(status.Get_count(MPI.BYTE))
+        comm.Recv([payload, MPI.BYTE], source=0, tag=11)
+        data_received = loads(payload)
         print(f"Rank 1: Received data from rank 0: {data_received}")
 
     # Barrier before collective operations
@@ -8,6 +8,7 @@ import sys
 import time
 import socket
 import os
+from collections import Counter
 
 try:
     from mpi4py import MPI
@@ -18,38 +19,41 @@ except ImportError:
 
 import numpy as np
 
+# Fixed width of each name field exchanged in test_process_mapping
+NAME_FIELD_BYTES = 64
 
-def benchmark_allreduce(comm, data_size):
-    """Benchmark MPI Allreduce operation"""
-    rank = comm.Get_rank()
-    size = comm.Get_size()
 
-    # Create test data
-    if rank == 0:
-        data = np.random.random(data_size).astype(np.float64)
-    else:
-        data = np.zeros(data_size, dtype=np.float64)
+def benchmark_allreduce(comm, data, result):
+    """Benchmark MPI Allreduce operation
+
+    data holds input already broadcast from rank 0; data and result are
+    preallocated float64 buffers of equal length so no allocation or
+    first-touch page faults land in the timed region.
+    """
+    size = comm.Get_size()
 
-    # Broadcast initial data
-    comm.Bcast(data, root=0)
+    # Expected result (sum should be size * original_sum), computed once
+    # before the timed region; every rank holds the same broadcast data
+    expected_sum = float(data.sum()) * size
 
     # Time the allreduce operation
     start_time = time.time()
-    result = np.zeros_like(data)
-    comm.Allreduce(data, result, op=MPI.SUM)
+    comm.Allreduce([data, MPI.DOUBLE], [result, MPI.DOUBLE], op=MPI.SUM)
     end_time = time.time()
 
-    # Verify correctness (sum should be size * original_sum)
-    expected_sum = np.sum(data) * size
-    actual_sum = np.sum(result)
+    # Verify correctness; rounding error grows with the number of summed terms
+    actual_sum = float(result.sum(dtype=np.float64))
 
-    is_correct = abs(actual_sum - expected_sum) < 1e-10
+    is_correct = abs(actual_sum - expected_sum) < 1e-10 * len(data) * size
 
     return end_time - start_time, is_correct, actual_sum, expected_sum
 
 
-def benchmark_send_recv(comm, message_size):
-    """Benchmark point-to-point communication"""
+def benchmark_send_recv(comm, send_data, recv_data):
+    """Benchmark point-to-point communication
+
+    send_data and recv_data are preallocated float64 buffers of equal length.
+    """
     rank = comm.Get_rank()
     size = comm.Get_size()
 
@@ -57,7 +61,7 @@ def benchmark_send_recv(comm, message_size):
         return 0.0, True  # Skip if only one process
 
     # Create test message
-    send_data = np.random.random(message_size).astype(np.float64)
+    send_data[:] = np.random.random(len(send_data))
 
     total_time = 0.0
     num_rounds = 10
@@ -66,22 +70,20 @@ def benchmark_send_recv(comm, message_size):
         if rank == 0:
             # Send to rank 1, receive from rank 1
             start_time = time.time()
-            comm.Send(send_data, dest=1, tag=round_num)
-            recv_data = np.zeros_like(send_data)
-            comm.Recv(recv_data, source=1, tag=round_num)
+            comm.Send([send_data, MPI.DOUBLE], dest=1, tag=round_num)
+            comm.Recv([recv_data, MPI.DOUBLE], source=1, tag=round_num)
             end_time = time.time()
 
             total_time += end_time - start_time
 
-            # Verify data integrity
-            if not np.allclose(send_data, recv_data):
-                return total_time / num_rounds, False
-
         elif rank == 1:
             # Receive from rank 0, send back to rank 0
-            recv_data = np.zeros_like(send_data)
-            comm.Recv(recv_data, source=0, tag=round_num)
-            comm.Send(recv_data, dest=0, tag=round_num)
+            comm.Recv([recv_data, MPI.DOUBLE], source=0, tag=round_num)
+            comm.Send([recv_data, MPI.DOUBLE], dest=0, tag=round_num)
+
+    # Verify data integrity once; every round echoes the same message
+    if rank == 0 and not np.allclose(send_data, recv_data):
+        return total_time / num_rounds, False
 
     return total_time / num_rounds, True
 
@@ -94,24 +96,27 @@ def test_process_mapping(comm):
     hostname = socket.gethostname()
     processor_name = MPI.Get_processor_name()
 
-    # Gather hostname information from all processes
-    hostnames = comm.gather(hostname, root=0)
-    processor_names = comm.gather(processor_name, root=0)
+    # Gather (hostname, processor name) as fixed-width byte records in one
+    # native Gather instead of pickling Python strings per rank
+    local = np.array(
+        [hostname.encode()[:NAME_FIELD_BYTES],
+         processor_name.encode()[:NAME_FIELD_BYTES]],
+        dtype=f'S{NAME_FIELD_BYTES}')
+    names = np.empty((size, 2), dtype=f'S{NAME_FIELD_BYTES}') if rank == 0 else None
+    comm.Gather([local, MPI.CHAR], [names, MPI.CHAR] if rank == 0 else None, root=0)
 
     if rank == 0:
         print(f"\nProcess Mapping (Total processes: {size}):")
         print("-" * 60)
 
         # Count processes per node
-        node_counts = {}
-        for i, host in enumerate(hostnames):
-            node_counts[host] = node_counts.get(host, 0) + 1
+        node_counts = Counter(host.decode() for host in names[:, 0])
 
         for host, count in sorted(node_counts.items()):
             print(f"Node {host}: {count} processes")
 
         # Check for unique processor names (indicates different physical cores)
-        unique_processors = len(set(processor_names))
+        unique_processors = len(set(names[:, 1]))
         print(f"Unique processor names: {unique_processors}")
 
         return len(node_counts) > 0  # At least one node has processes
@@ -130,50 +135,72 @@ def run_scaling_tests(comm):
 
     # Test different message sizes for allreduce
     data_sizes = [1, 100, 1000, 10000, 100000]
+    message_sizes = [1, 100, 1000, 10000]
+
+    # Allocate once for the largest size; each benchmark works on views
+    buf_send = np.empty(max(message_sizes), dtype=np.float64)
+    buf_recv = np.empty(max(data_sizes + message_sizes), dtype=np.float64)
 
+    # Inputs for every allreduce size, packed end to end so rank 0 can
+    # broadcast them all in a single collective
+    inputs = np.empty(sum(data_sizes), dtype=np.float64)
     if rank == 0:
-        print("
-Allreduce Benchmark:")
+        inputs[:] = np.random.random(len(inputs))
+    comm.Bcast([inputs, MPI.DOUBLE], root=0)
+    offsets = np.cumsum([0] + data_sizes[:-1])
+
+    if rank == 0:
+        print("\nAllreduce Benchmark:")
         print("Size\t\tTime(s)\t\tCorrectness")
         print("-" * 40)
 
-    for data_size in data_sizes:
-        time_taken, is_correct, actual, expected = benchmark_allreduce(comm, data_size)
+    # Per-size correctness flags, reduced across ranks in one collective
+    correctness = np.ones(len(data_sizes), dtype=np.uint8)
+
+    for i, (offset, data_size) in enumerate(zip(offsets, data_sizes)):
+        time_taken, is_correct, actual, expected = benchmark_allreduce(
+            comm, inputs[offset:offset + data_size], buf_recv[:data_size])
+        correctness[i] = is_correct
 
         if rank == 0:
             status = "✓" if is_correct else "✗"
-            print("8d")
+            print(f"{data_size:<8d}\t{time_taken:.6f}\t{status}")
 
-        # Check that all processes agree on correctness
-        all_correct = comm.allreduce(1 if is_correct else 0, op=MPI.MIN)
-        if all_correct != 1:
-            if rank == 0:
-                print(f"❌ Correctness check failed for size {data_size}")
-            return False
+    # Check that all processes agree on correctness
+    comm.Allreduce(MPI.IN_PLACE, [correctness, MPI.UNSIGNED_CHAR], op=MPI.MIN)
+    if not correctness.all():
+        if rank == 0:
+            for data_size, ok in zip(data_sizes, correctness):
+                if not ok:
+                    print(f"❌ Correctness check failed for size {data_size}")
+        return False
 
     # Test point-to-point communication
     if size >= 2:
         if rank == 0:
-            print("
-Point-to-Point Benchmark:")
+            print("\nPoint-to-Point Benchmark:")
             print("Size\t\tTime(s)\t\tCorrectness")
             print("-" * 40)
 
-        message_sizes = [1, 100, 1000, 10000]
+        correctness = np.ones(len(message_sizes), dtype=np.uint8)
 
-        for msg_size in message_sizes:
-            time_taken, is_correct = benchmark_send_recv(comm, msg_size)
+        for i, msg_size in enumerate(message_sizes):
+            time_taken, is_correct = benchmark_send_recv(
+                comm, buf_send[:msg_size], buf_recv[:msg_size])
+            correctness[i] = is_correct
 
             if rank == 0:
                 status = "✓" if is_correct else "✗"
-                print("8d")
-
-            # Check that root process reports success
-            all_correct = comm.allreduce(1 if is_correct else 0, op=MPI.MIN)
-            if all_correct != 1:
-                if rank == 0:
-                    print(f"❌ P2P test failed for size {msg_size}")
-                return False
+                print(f"{msg_size:<8d}\t{time_taken:.6f}\t{status}")
+
+        # Check that root process reports success
+        comm.Allreduce(MPI.IN_PLACE, [correctness, MPI.UNSIGNED_CHAR], op=MPI.MIN)
+        if not correctness.all():
+            if rank == 0:
+                for msg_size, ok in zip(message_sizes, correctness):
+                    if not ok:
+                        print(f"❌ P2P test failed for size {msg_size}")
+            return False
 
     return True
 
@@ -8,18 +8,54 @@ Tests various multi-node SLURM functionality including:
 - Resource allocation
 """
 
+import io
 import subprocess
 import sys
 import os
+import re
+import shlex
+import shutil
+import signal
 import socket
-import time
+import stat
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
-def run_command(cmd, description=""):
-    """Run a command and return (success, output, error)"""
+# Resolved once; gethostname can block on a misconfigured resolver
+HOSTNAME = socket.gethostname()
+SHORT_HOSTNAME = HOSTNAME.split('.')[0]
+
+# Slurm hostlist parsing: top-level items ("node[01-04,07]", "login1") and
+# the bracketed range group within an item
+_HOSTLIST_ITEM_RE = re.compile(r'(?:[^,\[\]]|\[[^\]]*\])+')
+_HOSTLIST_RANGE_RE = re.compile(r'\[([^\]]*)\]')
+
+# Multiplex SSH sessions so repeated connections to a node skip the handshake
+# (ConnectTimeout is added per attempt by the backoff helpers)
+SSH_OPTS = ("-o StrictHostKeyChecking=no -o ControlMaster=auto "
+            "-o ControlPath=/tmp/clusteros-ssh-%r@%h:%p -o ControlPersist=120")
+
+# One pool for all ping/ssh probes, shared by the network tests so they
+# reuse threads (and can overlap) instead of each building its own
+PROBE_EXECUTOR = ThreadPoolExecutor(max_workers=min(64, 4 * (os.cpu_count() or 8)))
+
+
+def run_command(cmd, description="", env=None):
+    """Run a command and return (success, output, error)
+
+    cmd may be an argv list, exec'd directly without /bin/sh, or a string,
+    which is run through the shell.
+    """
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
+        result = subprocess.run(cmd, shell=isinstance(cmd, str), capture_output=True, text=True, timeout=30, env=env)
         success = result.returncode == 0
         output = result.stdout.strip()
         error = result.stderr.strip()
@@ -30,31 +66,177 @@ def run_command(cmd, description=""):
         return False, "", str(e)
 
 
+def run_command_lines(cmd, timeout=30):
+    """Run an argv command and yield its stdout lines as they are produced
+
+    Lets callers act on early output before the command has finished,
+    instead of waiting for the whole buffered result. The command is
+    killed once timeout seconds have passed, even mid-read. Raises
+    RuntimeError if the command cannot start, times out or exits non-zero.
+    """
+    # stderr goes to a file rather than a pipe nobody reads while streaming
+    with tempfile.TemporaryFile(mode='w+') as stderr:
+        try:
+            # Own session, so a timeout also kills children holding stdout open
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True, bufsize=1,
+                                    start_new_session=True)
+        except OSError as e:
+            raise RuntimeError(str(e)) from e
+
+        timed_out = threading.Event()
+
+        def expire():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        timer = threading.Timer(timeout, expire)
+        timer.start()
+        try:
+            with proc:
+                for line in proc.stdout:
+                    yield line.rstrip('\n')
+        finally:
+            timer.cancel()
+
+        if timed_out.is_set():
+            raise RuntimeError("Command timed out")
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(stderr.read().strip() or f"exit status {proc.returncode}")
+
+
+def backoff_timeouts(initial, maximum):
+    """Yield probe timeouts doubling from initial, ending with maximum"""
+    timeout = initial
+    while timeout < maximum:
+        yield timeout
+        timeout *= 2
+    yield maximum
+
+
+@lru_cache(maxsize=None)
+def resolve_node(node):
+    """Return node's IPv4 address, or the name itself if it doesn't resolve
+
+    Cached so each node costs one resolver lookup per run; ping and ssh
+    are then given the address and skip NSS on every attempt.
+    """
+    try:
+        return socket.gethostbyname(node)
+    except OSError:
+        return node
+
+
+def ping_node(node):
+    """Ping node, retrying with a doubling timeout (0.25s up to 2s)
+
+    Healthy nodes answer on the first short attempt; a single dropped
+    packet on a lossy link no longer fails the probe.
+    """
+    address = resolve_node(node)
+    for timeout in backoff_timeouts(0.25, 2):
+        success, output, error = run_command(["ping", "-c", "1", "-W", f"{timeout:g}", address])
+        if success:
+            break
+    return success, output, error
+
+
+def ssh_node(node, command):
+    """Run command on node over ssh, retrying with a doubling connect timeout
+
+    Connects by address; HostKeyAlias keeps known_hosts keyed by name.
+    """
+    address = resolve_node(node)
+    for timeout in backoff_timeouts(2, 8):
+        success, output, error = run_command(
+            ["ssh", "-o", f"ConnectTimeout={timeout}", "-o", f"HostKeyAlias={node}",
+             *shlex.split(SSH_OPTS), address, command])
+        if success:
+            break
+    return success, output, error
+
+
+def _expand_hostlist_item(item):
+    """Expand the bracket ranges of one hostlist item, e.g. "node[01-03]" """
+    match = _HOSTLIST_RANGE_RE.search(item)
+    if not match:
+        return [item]
+
+    prefix = item[:match.start()]
+    tails = _expand_hostlist_item(item[match.end():])
+    names = []
+    for part in match.group(1).split(','):
+        lo, _, hi = part.partition('-')
+        if hi:
+            # Keep zero padding: node[01-10] -> node01 ... node10
+            ids = [str(i).zfill(len(lo)) for i in range(int(lo), int(hi) + 1)]
+        else:
+            ids = [lo]
+        names.extend(prefix + i + tail for i in ids for tail in tails)
+    return names
+
+
+@lru_cache(maxsize=8)
+def expand_nodelist(nodelist):
+    """Expand a Slurm hostlist such as "node[01-04,07],login1" into names
+
+    Pure-Python equivalent of `scontrol show hostnames`, without the
+    fork/exec or the RPC to slurmctld.
+    """
+    names = []
+    for item in _HOSTLIST_ITEM_RE.findall(nodelist):
+        names.extend(_expand_hostlist_item(item))
+    return tuple(names)
+
+
+def read_mem_total():
+    """Return total memory in bytes, via psutil or /proc/meminfo"""
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('MemTotal:'):
+                return int(line.split()[1]) * 1024
+    raise ValueError("MemTotal not found in /proc/meminfo")
+
+
 def test_node_discovery():
     """Test that we can discover other nodes in the cluster"""
     print("\n" + "="*60)
     print("TEST: Node Discovery")
     print("="*60)
 
-    # Get SLURM node list
-    success, nodes, error = run_command("sinfo -N -h | awk '{print $1}' | sort | uniq")
-    if not success:
-        print(f"❌ Failed to get node list: {error}")
+    # Stream the SLURM node list and start pinging each node as soon as
+    # sinfo prints it, overlapping discovery with the connectivity probes
+    failed_nodes = []
+    futures = {}
+    seen = set()
+    try:
+        for line in run_command_lines(["sinfo", "-N", "-h", "-o", "%N"]):
+            node = line.strip()
+            # sinfo -N prints one line per node per partition; dedupe here
+            if node and node not in seen:
+                seen.add(node)
+                futures[PROBE_EXECUTOR.submit(ping_node, node)] = node
+    except RuntimeError as e:
+        print(f"❌ Failed to get node list: {e}")
         return False
 
-    node_list = nodes.split('\n') if nodes else []
+    node_list = sorted(futures.values())
     print(f"Discovered nodes: {', '.join(node_list)}")
 
-    # Test connectivity to each node
-    failed_nodes = []
-    for node in node_list:
-        if node.strip():
-            success, output, error = run_command(f"ping -c 1 -W 2 {node}")
-            if success:
-                print(f"✅ {node}: reachable")
-            else:
-                print(f"❌ {node}: unreachable - {error}")
-                failed_nodes.append(node)
+    # Test connectivity to each node; results arrive as pings complete
+    for future in as_completed(futures):
+        node = futures[future]
+        success, output, error = future.result()
+        if success:
+            print(f"✅ {node}: reachable")
+        else:
+            print(f"❌ {node}: unreachable - {error}")
+            failed_nodes.append(node)
 
     if failed_nodes:
         print(f"⚠️  Warning: {len(failed_nodes)} nodes unreachable")
@@ -70,37 +252,43 @@ def test_shared_filesystem():
     print("TEST: Shared Filesystem")
     print("="*60)
 
-    hostname = socket.gethostname()
-    test_file = f"/tmp/slurm_test_{hostname}_{int(time.time())}.txt"
+    hostname = HOSTNAME
     test_content = f"Test file created by {hostname} at {datetime.now()}"
 
-    # Create test file
+    # Create test file; NamedTemporaryFile reserves a unique name atomically
+    # and removes the file when the block exits, even if a check fails
     try:
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-        print(f"✅ Created test file: {test_file}")
+        test_file = tempfile.NamedTemporaryFile(
+            mode='w', prefix=f"slurm_test_{hostname}_", suffix='.txt', dir='/tmp')
+        test_file.write(test_content)
+        test_file.flush()
+        print(f"✅ Created test file: {test_file.name}")
     except Exception as e:
         print(f"❌ Failed to create test file: {e}")
         return False
 
-    # Test file permissions and access
-    success, output, error = run_command(f"ls -la {test_file}")
-    if success:
-        print(f"✅ File permissions: {output}")
-    else:
-        print(f"❌ Failed to check file permissions: {error}")
-        return False
+    with test_file:
+        # Test file permissions and access
+        try:
+            st = os.stat(test_file.name)
+            print(f"✅ File permissions: {stat.filemode(st.st_mode)} uid={st.st_uid} size={st.st_size}")
+        except OSError as e:
+            print(f"❌ Failed to check file permissions: {e}")
+            return False
 
-    # Test file content
-    success, output, error = run_command(f"cat {test_file}")
-    if success and output.strip() == test_content:
-        print("✅ File content verified")
-    else:
-        print(f"❌ File content mismatch: {output}")
-        return False
+        # Test file content
+        try:
+            with open(test_file.name) as f:
+                content = f.read()
+        except OSError as e:
+            print(f"❌ Failed to read test file: {e}")
+            return False
+        if content.strip() == test_content:
+            print("✅ File content verified")
+        else:
+            print(f"❌ File content mismatch: {content}")
+            return False
 
-    # Cleanup
-    os.remove(test_file)
     print("✅ Test file cleaned up")
 
     return True
@@ -112,24 +300,60 @@ def test_network_connectivity():
     print("TEST: Network Connectivity")
     print("="*60)
 
+    # Single-node allocations have nothing to test; skip before any parsing
+    num_nodes = os.environ.get('SLURM_NNODES', '')
+    if num_nodes.isdigit() and int(num_nodes) < 2:
+        print("⚠️  Only one node allocated - skipping network tests")
+        return True
+
     # Get all allocated nodes for this job
-    success, nodes, error = run_command("scontrol show hostnames $SLURM_NODELIST")
-    if not success:
-        print(f"❌ Failed to get allocated nodes: {error}")
+    nodelist = os.environ.get('SLURM_NODELIST', '')
+    try:
+        node_list = list(expand_nodelist(nodelist))
+    except ValueError as e:
+        print(f"❌ Failed to parse allocated nodes '{nodelist}': {e}")
+        return False
+    if not node_list:
+        print("❌ Failed to get allocated nodes: SLURM_NODELIST not set")
         return False
 
-    node_list = nodes.split('\n') if nodes else []
     if len(node_list) < 2:
         print("⚠️  Only one node allocated - skipping network tests")
         return True
 
     print(f"Testing connectivity between {len(node_list)} nodes: {', '.join(node_list)}")
 
-    # Test basic connectivity
+    # Test basic connectivity to every other node in parallel: one pdsh call
+    # if available, otherwise concurrent ssh processes
     success_count = 0
-    for node in node_list:
-        if node.strip() and node != socket.gethostname():
-            success, output, error = run_command(f"ssh -o ConnectTimeout=5 -o StrictHostKeyChecking=no {node} 'echo \"SSH to {node} successful\"'")
+    remote = [node for node in node_list if node.strip() and node not in (HOSTNAME, SHORT_HOSTNAME)]
+    if remote and shutil.which("pdsh"):
+        # Retry only the nodes not yet reached, doubling the connect timeout
+        reached = set()
+        pending = remote
+        for timeout in backoff_timeouts(2, 8):
+            success, output, error = run_command(
+                ["pdsh", "-R", "ssh", "-w", ','.join(pending), "-t", str(timeout), "-u", "10", "hostname"],
+                env={**os.environ, "PDSH_SSH_ARGS_APPEND": f"-o ConnectTimeout={timeout} {SSH_OPTS}"})
+            # pdsh prefixes each output line with "node: "; unreachable nodes print nothing
+            reached |= {line.split(':', 1)[0].strip() for line in output.splitlines() if ':' in line}
+            pending = [node for node in remote if node not in reached]
+            if not pending:
+                break
+        for node in remote:
+            if node in reached:
+                print(f"✅ SSH to {node}: successful")
+                success_count += 1
+            else:
+                print(f"❌ SSH to {node}: failed")
+        if success_count < len(remote) and error:
+            print(f"pdsh errors:\n{error}")
+    elif remote:
+        futures = {PROBE_EXECUTOR.submit(ssh_node, node, f"echo 'SSH to {node} successful'"): node
+                   for node in remote}
+        for future in as_completed(futures):
+            node = futures[future]
+            success, output, error = future.result()
             if success:
                 print(f"✅ SSH to {node}: successful")
                 success_count += 1
@@ -158,14 +382,11 @@ def test_slurm_environment():
         'SLURM_PROCID'
     ]
 
-    missing_vars = []
-    for var in required_vars:
-        value = os.environ.get(var)
-        if value:
-            print(f"✅ {var} = {value}")
-        else:
-            print(f"❌ {var} = (not set)")
-            missing_vars.append(var)
+    # Snapshot the environment once and report every variable in one print
+    env = dict(os.environ)
+    missing_vars = [var for var in required_vars if not env.get(var)]
+    print("\n".join(f"✅ {var} = {env[var]}" if env.get(var) else f"❌ {var} = (not set)"
+                    for var in required_vars))
 
     if missing_vars:
         print(f"⚠️  Missing SLURM variables: {', '.join(missing_vars)}")
@@ -182,19 +403,16 @@ def test_resource_allocation():
     print("="*60)
 
     # Check CPU allocation
-    success, cpus, error = run_command("nproc")
-    if success:
-        print(f"✅ Available CPUs: {cpus}")
-    else:
-        print(f"❌ Failed to get CPU count: {error}")
-        return False
+    # CPUs this process may run on (respects Slurm's cpuset, like nproc)
+    cpus = len(os.sched_getaffinity(0))
+    print(f"✅ Available CPUs: {cpus}")
 
     # Check memory
-    success, mem, error = run_command("free -h | grep '^Mem:' | awk '{print $2}'")
-    if success:
-        print(f"✅ Total memory: {mem}")
-    else:
-        print(f"❌ Failed to get memory info: {error}")
+    try:
+        mem = read_mem_total()
+        print(f"✅ Total memory: {mem / 1e9:.1f} GB")
+    except (OSError, ValueError) as e:
+        print(f"❌ Failed to get memory info: {e}")
         return False
 
     # Check SLURM CPU allocation
@@ -207,33 +425,82 @@ def test_resource_allocation():
     return True
 
 
+class ThreadBufferedOutput(io.TextIOBase):
+    """stdout proxy that lets worker threads buffer their own output
+
+    Writes from a thread inside capture() go to that thread's buffer; all
+    other writes pass straight through to the wrapped stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        buf = getattr(self._local, 'buf', None)
+        return (buf if buf is not None else self._stream).write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def capture(self, func, *args):
+        """Run func(*args) in this thread with output buffered
+
+        Returns (result, output).
+        """
+        self._local.buf = io.StringIO()
+        try:
+            return func(*args), self._local.buf.getvalue()
+        finally:
+            self._local.buf = None
+
+
+def run_test(test_name, test_func):
+    """Run a single test and report it; returns True if it passed"""
+    try:
+        if test_func():
+            print(f"✅ {test_name}: PASSED")
+            return True
+        print(f"❌ {test_name}: FAILED")
+    except Exception as e:
+        print(f"❌ {test_name}: ERROR - {e}")
+    return False
+
+
 def main():
     """Run all multi-node tests"""
     print("ClusterOS SLURM Multi-Node Test Suite")
     print(f"Started at: {datetime.now()}")
-    print(f"Running on: {socket.gethostname()}")
+    print(f"Running on: {HOSTNAME}")
     print(f"Process ID: {os.getpid()}")
 
-    tests = [
-        ("SLURM Environment", test_slurm_environment),
+    # The environment check runs first; the remaining tests are dominated by
+    # subprocess/network latency and touch disjoint files, so they run
+    # concurrently with their output buffered and printed in order
+    env_test = ("SLURM Environment", test_slurm_environment)
+    concurrent_tests = [
         ("Node Discovery", test_node_discovery),
         ("Shared Filesystem", test_shared_filesystem),
         ("Network Connectivity", test_network_connectivity),
         ("Resource Allocation", test_resource_allocation),
     ]
 
-    passed = 0
-    total = len(tests)
+    total = 1 + len(concurrent_tests)
+    passed = int(run_test(*env_test))
 
-    for test_name, test_func in tests:
-        try:
-            if test_func():
-                passed += 1
-                print(f"✅ {test_name}: PASSED")
-            else:
-                print(f"❌ {test_name}: FAILED")
-        except Exception as e:
-            print(f"❌ {test_name}: ERROR - {e}")
+    stdout = sys.stdout
+    output = ThreadBufferedOutput(stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=len(concurrent_tests)) as pool:
+            results = list(pool.map(lambda test: output.capture(run_test, *test), concurrent_tests))
+    finally:
+        sys.stdout = stdout
+        PROBE_EXECUTOR.shutdown()
+
+    for test_passed, test_output in results:
+        sys.stdout.write(test_output)
+        passed += test_passed
 
     print("\n" + "="*60)
     print("TEST SUMMARY")
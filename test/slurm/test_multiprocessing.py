@@ -4,20 +4,34 @@ Test Python multiprocessing on SLURM cluster
 This tests that Python's multiprocessing library works correctly across SLURM
 """
 
-from multiprocessing import Pool, cpu_count
+import multiprocessing
+from multiprocessing import Pool
 import socket
 import os
 import sys
 
 
+# Set once per pool worker by _init
+_hostname = None
+_pid = None
+
+
+def _init():
+    """Pool initializer: cache this worker's hostname and PID once"""
+    global _hostname, _pid
+    _hostname = socket.gethostname()
+    _pid = os.getpid()
+
+
 def worker_task(x):
     """
     Simple worker task that returns host and computation result
+
+    Returns a (hostname, pid, input, result) tuple; formatting happens in
+    the parent so workers only pickle a few small values. Hostname and PID
+    are looked up once per worker by _init rather than once per task.
     """
-    hostname = socket.gethostname()
-    pid = os.getpid()
-    result = x * x
-    return f"Host: {hostname}, PID: {pid}, Input: {x}, Result: {result}"
+    return _hostname, _pid, x, x * x
 
 
 def main():
@@ -25,8 +39,9 @@ def main():
     print("Python Multiprocessing Test on SLURM")
     print("=" * 60)
 
-    # Get available CPUs (SLURM sets this appropriately)
-    num_cpus = cpu_count()
+    # Size the pool to the CPUs Slurm allocated; cpu_count() reports every
+    # core on the host and ignores the job's cpuset/cgroup limits
+    num_cpus = int(os.environ.get('SLURM_CPUS_ON_NODE') or len(os.sched_getaffinity(0)))
     print(f"Available CPUs: {num_cpus}")
     print(f"Running on host: {socket.gethostname()}")
     print(f"Main process PID: {os.getpid()}")
@@ -35,15 +50,17 @@ def main():
     data = list(range(1, 17))  # 16 tasks
     print(f"\nProcessing {len(data)} tasks with {num_cpus} processes...")
 
-    # Process with multiprocessing pool
-    with Pool(processes=num_cpus) as pool:
-        results = pool.map(worker_task, data)
+    # Process with multiprocessing pool, handing each worker a contiguous
+    # chunk of inputs per IPC round-trip
+    chunk = max(1, len(data) // num_cpus)
+    with Pool(processes=num_cpus, initializer=_init) as pool:
+        results = list(pool.imap_unordered(worker_task, data, chunksize=chunk))
 
     # Display results
     print("\nResults:")
     print("-" * 60)
-    for result in results:
-        print(result)
+    print("\n".join(f"Host: {hostname}, PID: {pid}, Input: {x}, Result: {result}"
+                    for hostname, pid, x, result in results))
 
     print("-" * 60)
     print(f"✓ Successfully processed {len(results)} tasks")
@@ -53,4 +70,7 @@ def main():
 
 
 if __name__ == '__main__':
+    # Fork workers rather than spawning fresh interpreters that re-import
+    # this module (the default start method is not fork everywhere)
+    multiprocessing.set_start_method('fork', force=True)
     sys.exit(main())